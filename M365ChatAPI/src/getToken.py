@@ -3,7 +3,9 @@ import logging
 import asyncio
 import webbrowser
 from dotenv import load_dotenv
-import os
+import time
+import orjson
+import base64
 from .local_token_cache import LocalTokenCache
 
 logger = logging.getLogger(__name__)
@@ -20,12 +22,30 @@ SCOPES = ["https://graph.microsoft.com/.default"]
 AUTHORITY = f"https://login.microsoftonline.com/{TENANT_ID}"
 GRAPH_API_URL = "https://graph.microsoft.com/beta/copilot" # Using the beta endpoint for the Chat API
 
+# In-process (access_token, exp) per (client, tenant, scopes), reused until close to expiring.
+# The 5 minute margin matches the window in which MSAL itself refreshes.
+TOKEN_REFRESH_MARGIN = 300
+_MEM: dict[tuple, tuple[str, float]] = {}
+
 
 async def open_browser(url: str):
     logger.debug(f"Opening browser at {url}")
-    await asyncio.get_event_loop().run_in_executor(None, lambda: webbrowser.open(url))
+    await asyncio.to_thread(webbrowser.open, url)
+
+def _token_expiry(token: str) -> float:
+    """Reads the `exp` claim of a JWT access token. The signature is not verified."""
+    try:
+        payload = token.split(".")[1]
+        claims = orjson.loads(base64.urlsafe_b64decode(payload + "=" * (-len(payload) % 4)))
+        return float(claims["exp"])
+    except (IndexError, KeyError, TypeError, ValueError):
+        return 0
 
 def acquire_token():
+    key = (CLIENT_ID, TENANT_ID, tuple(SCOPES))
+    if key in _MEM and _MEM[key][1] - time.time() > TOKEN_REFRESH_MARGIN:
+        return _MEM[key][0]
+
     pca = PublicClientApplication(
         client_id=CLIENT_ID,
         authority=f"https://login.microsoftonline.com/{TENANT_ID}",
@@ -57,4 +77,7 @@ def acquire_token():
         response = pca.acquire_token_interactive(**token_request)
         token = response.get("access_token")
 
+    if token:
+        _MEM[key] = (token, _token_expiry(token))
+
     return token
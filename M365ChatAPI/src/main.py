@@ -1,79 +1,108 @@
-import requests
+import httpx
+import orjson
 import asyncio
-import json
-import time
 from src.getToken import acquire_token
 import sys
 
 GRAPH_API_URL = "https://graph.microsoft.com/beta/copilot" # Using the beta endpoint for the Chat API
+# Copilot can take a while to answer, so only the connect phase gets a tight timeout
+GRAPH_TIMEOUT = httpx.Timeout(120.0, connect=10.0)
+# Constant request fragments, encoded once instead of per call
+_EMPTY_BODY = b"{}"
+_LOC_HINT = {"timeZone": "America/New_York"}
 
 async def ainput(string: str) -> str:
-    await asyncio.get_event_loop().run_in_executor(
-        None, lambda s=string: sys.stdout.write(s + " ")
-    )
-    return await asyncio.get_event_loop().run_in_executor(None, sys.stdin.readline)
+    await asyncio.to_thread(sys.stdout.write, string + " ")
+    return await asyncio.to_thread(sys.stdin.readline)
 
 def get_access_token():
-    if acquire_token():
-        return acquire_token()
-    else:
+    token = acquire_token()
+    if not token:
         raise Exception(f"Could not acquire token")
+    return token
 
-def create_conversation(token):
+def create_client(token):
+    """Creates the pooled async HTTP client shared by every Graph call in the session."""
+    # HTTP/2 multiplexes concurrent requests over one TLS connection (needs httpx[http2])
+    return httpx.AsyncClient(
+        http2=True,
+        headers={
+            "Authorization": f"Bearer {token}",
+            "Content-Type": "application/json"
+        },
+        limits=httpx.Limits(max_connections=8, max_keepalive_connections=8, keepalive_expiry=75),
+        timeout=GRAPH_TIMEOUT,
+    )
+
+async def create_conversation(client):
     """Creates a new Copilot conversation and returns its ID."""
-    headers = {
-        "Authorization": f"Bearer {token}",
-        "Content-Type": "application/json"
-    }
     # An empty body is required to create a new conversation
-    response = requests.post(f"{GRAPH_API_URL}/conversations", headers=headers, data=json.dumps({}))
-    print(f"Response: {response.json()}")
+    response = await client.post(f"{GRAPH_API_URL}/conversations", content=_EMPTY_BODY)
+    conversation_data = orjson.loads(response.content)
+    print(f"Response: {conversation_data}")
     response.raise_for_status()
-    conversation_data = response.json()
     print(f"Created conversation with ID: {conversation_data['id']}")
     return conversation_data["id"]
 
-async def send_message(token, conversation_id):
-    prompt_text = (await ainput("\n>>>: ")).lower().strip()
+async def stream_reply(client, url, payload):
+    """Prints Copilot's answer as it streams in and returns the final conversation data."""
+    conversation_data = {}
+    printed = ""
+    async with client.stream("POST", url, content=payload, headers={"Accept": "text/event-stream"}) as response:
+        response.raise_for_status()
+        # Each server-sent event carries the conversation so far; only the new text is written
+        async for line in response.aiter_lines():
+            if not line.startswith("data:"):
+                continue
+            conversation_data = orjson.loads(line[5:])
+            messages = conversation_data.get("messages", [])
+            text = (messages[1].get("text") or "") if len(messages) > 1 else ""
+            if not printed and text:
+                sys.stdout.write("\nCopilot: ")
+            if text.startswith(printed):
+                delta, printed = text[len(printed):], text
+            else:
+                delta, printed = text, printed + text
+            sys.stdout.write(delta)
+            sys.stdout.flush()
+    if printed:
+        sys.stdout.write("\n")
+    return conversation_data
 
-    if prompt_text == "exit":
-        sys.exit(0)
-    else:
-        """Sends a message to an existing conversation and gets the response."""
-        headers = {
-            "Authorization": f"Bearer {token}",
-            "Content-Type": "application/json"
-        }
-        payload = {
+async def chat_loop(client, conversation_id):
+    """Sends each prompt to an existing conversation and prints the response until the user exits."""
+    # The streaming variant of the synchronous chat endpoint, so the answer shows as it is generated
+    url = f"{GRAPH_API_URL}/conversations/{conversation_id}/chatOverStream"
+
+    while True:
+        prompt_text = (await ainput("\n>>>: ")).lower().strip()
+        if prompt_text == "exit":
+            return
+
+        payload = orjson.dumps({
             "message": {
-            "text": prompt_text
-        },
-        "locationHint": {
-            "timeZone": "America/New_York"
-            }
-        }
+                "text": prompt_text
+            },
+            "locationHint": _LOC_HINT
+        })
 
-        # The endpoint for continuing a synchronous chat
-        url = f"{GRAPH_API_URL}/conversations/{conversation_id}/chat"
-        response = requests.post(url, headers=headers, data=json.dumps(payload))
-        response.raise_for_status()
-        
-        # Process the response to extract the Copilot's answer
-        response_data = response.json()
-        try:
-            print(f"\nCopilot: {response_data['messages'][1]['text']}")
-        except (KeyError, IndexError):
+        response_data = await stream_reply(client, url, payload)
+        messages = response_data.get("messages", [])
+        if len(messages) < 2 or not messages[1].get("text"):
             print("Error: Could not extract specific message text from response.")
             print(f"Full response data: {response_data}")
-        await send_message(token, conversation_id) 
 
 async def main():
     print("\nSay Hi to connect to M365 Copilot.... ")
     try:
         token = get_access_token()
-        conversation_id = create_conversation(token)
-        await send_message(token, conversation_id)
+        async with create_client(token) as client:
+            conversation_id = await create_conversation(client)
+            await chat_loop(client, conversation_id)
     except Exception as e:
         print(f"An error occurred: {e}")
 
-asyncio.run(main())        
+if __name__ == "__main__":
+    # Run the main asynchronous function; the Runner keeps one loop and executor for its lifetime
+    with asyncio.Runner() as runner:
+        runner.run(main())
@@ -1,9 +1,7 @@
 import asyncio
-import os
 import datetime
+import logging
 import sys
-import webbrowser
-import gradio as gr
 
 from azure.identity import DeviceCodeCredential
 from kiota_abstractions.api_error import APIError
@@ -11,6 +9,8 @@ from microsoft_agents_m365copilot.agents_m365_copilot_service_client import Agen
 from microsoft_agents_m365copilot.generated.copilot.retrieval.retrieval_post_request_body import RetrievalPostRequestBody
 from microsoft_agents_m365copilot.generated.models.retrieval_data_source import RetrievalDataSource
 
+logger = logging.getLogger(__name__)
+
 scopes = ['Files.Read.All', 'Sites.Read.All']
 
 # Multi-tenant apps can use "common",
@@ -27,15 +27,15 @@ def auth_callback(verification_uri: str, user_code: str, expires_on: datetime):
     print(f"The code will expire at {expires_on}")
 
 async def ainput(string: str) -> str:
-    await asyncio.get_event_loop().run_in_executor(
-        None, lambda s=string: sys.stdout.write(s + " ")
-    )
-    return await asyncio.get_event_loop().run_in_executor(None, sys.stdin.readline)
+    await asyncio.to_thread(sys.stdout.write, string + " ")
+    return await asyncio.to_thread(sys.stdin.readline)
 
 async def ask_question():
     try:
-        query = (await ainput("\n>>>: ")).lower().strip()
-        if query:
+        while True:
+            query = (await ainput("\n>>>: ")).lower().strip()
+            if not query:
+                return
             # Print the URL being used
             # print(f"Using API base URL: {client.request_adapter.base_url}\n")
             print(f"Query: {query}" + ". Search the SharePoint to get the information required. Summarize the information.")
@@ -43,25 +43,29 @@ async def ask_question():
             retrieval_body = RetrievalPostRequestBody()
             retrieval_body.data_source = RetrievalDataSource.SharePoint
             retrieval_body.query_string = query
-        
+
             # Try more parameters that might be required
             # retrieval_body.maximum_number_of_results = 10
-            
+
             # Make the API call
             print("Making retrieval API request...")
             retrieval = await client.copilot.retrieval.post(retrieval_body)
-            
+
             # Process the results
             if retrieval and hasattr(retrieval, "retrieval_hits"):
-                print(f"Received {len(retrieval.retrieval_hits)} hits")
+                # Build the whole listing first and write it in one go rather than one print per extract
+                parts = [f"Received {len(retrieval.retrieval_hits)} hits\n"]
                 for r in retrieval.retrieval_hits:
-                    print(f"Web URL: {r.web_url}\n")
+                    parts.append(f"Web URL: {r.web_url}\n\n")
                     for extract in r.extracts:
-                        print(f"Text:\n{extract.text}\n")
-                print(f"Retrieval response structure: {dir(retrieval)}")   
+                        parts.append(f"Text:\n{extract.text}\n\n")
+                sys.stdout.write("".join(parts))
+                sys.stdout.flush()
             else:
-                print(f"Retrieval response structure: {dir(retrieval)}")
-            await ask_question()        
+                print("No retrieval hits returned.")
+            # dir() walks the whole model hierarchy, so only build it when someone will read it
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug("Retrieval response structure: %s", dir(retrieval))
     except APIError as e:
         print(f"Error: {e.error.code}: {e.error.message}")
         if hasattr(e, 'error') and hasattr(e.error, 'inner_error'):
@@ -83,4 +87,7 @@ async def main():
 
     await ask_question()
 
-asyncio.run(main())
+if __name__ == "__main__":
+    # Run the main asynchronous function; the Runner keeps one loop and executor for its lifetime
+    with asyncio.Runner() as runner:
+        runner.run(main())
@@ -5,6 +5,10 @@ import asyncio
 import webbrowser
 from dotenv import load_dotenv
 import os
+import time
+import orjson
+import base64
+import hashlib
 from .local_token_cache import LocalTokenCache
 
 
@@ -16,6 +20,9 @@ cache = msal.SerializableTokenCache()
 
 #cache file path
 CACHE_FILE = "./msal_cache.json"
+# The cache file is read once per process and only rewritten when its content changes
+_cache_loaded = False
+_last_serialized_hash = None
 
 TOKEN_CACHE = LocalTokenCache("./.local_token_cache.json")
 
@@ -28,25 +35,99 @@ SCOPES = ["https://graph.microsoft.com/.default"]
 
 AUTHORITY = f"https://login.microsoftonline.com/{TENANT_ID}"
 
+# Set M365_AUTH_FLOW=client_credentials (plus CLIENT_SECRET) for unattended runs without a browser login
+AUTH_FLOW = os.getenv("M365_AUTH_FLOW", "interactive")
+_confidential_app = None
+
+# In-process (access_token, exp) per (client, tenant, scopes), reused until close to expiring.
+# The 5 minute margin matches the window in which MSAL itself refreshes.
+TOKEN_REFRESH_MARGIN = 300
+_MEM: dict[tuple, tuple[str, float]] = {}
+
 async def open_browser(url: str):
     logger.debug(f"Opening browser at {url}")
-    await asyncio.get_event_loop().run_in_executor(None, lambda: webbrowser.open(url))
+    await asyncio.to_thread(webbrowser.open, url)
 
-def save_cache_on_exit():
-    if cache.has_state_changed:
-        print(f"Cache state changed. Saving to {CACHE_FILE}...")
-        with open(CACHE_FILE, "w") as f:
-            f.write(cache.serialize())
+def _digest(data: str) -> bytes:
+    return hashlib.blake2b(data.encode("utf-8"), digest_size=16).digest()
 
-def acquire_token():
+def load_cache():
+    global _cache_loaded, _last_serialized_hash
     # Load the cache from the file if it exists
-    if os.path.exists(CACHE_FILE):
-        try:
-            with open(CACHE_FILE, "r") as f:
-                cache.deserialize(f.read())
-            print(f"Loaded token cache from {CACHE_FILE}")
-        except Exception as e:
-            print(f"Error loading cache: {e}")  
+    if _cache_loaded or not os.path.exists(CACHE_FILE):
+        return
+    try:
+        with open(CACHE_FILE, "r") as f:
+            data = f.read()
+        cache.deserialize(data)
+        _cache_loaded = True
+        _last_serialized_hash = _digest(data)
+        print(f"Loaded token cache from {CACHE_FILE}")
+    except Exception as e:
+        print(f"Error loading cache: {e}")
+
+def save_cache_on_exit():
+    global _last_serialized_hash
+    if not cache.has_state_changed:
+        return
+    data = cache.serialize()
+    digest = _digest(data)
+    if digest == _last_serialized_hash:
+        return
+    print(f"Cache state changed. Saving to {CACHE_FILE}...")
+    # Write to a temp file and swap it in so a crash mid-write can't corrupt the cache
+    tmp_file = f"{CACHE_FILE}.tmp"
+    with open(tmp_file, "w") as f:
+        f.write(data)
+    os.replace(tmp_file, CACHE_FILE)
+    _last_serialized_hash = digest
+
+def _token_expiry(token: str) -> float:
+    """Reads the `exp` claim of a JWT access token. The signature is not verified."""
+    try:
+        payload = token.split(".")[1]
+        claims = orjson.loads(base64.urlsafe_b64decode(payload + "=" * (-len(payload) % 4)))
+        return float(claims["exp"])
+    except (IndexError, KeyError, TypeError, ValueError):
+        return 0
+
+def acquire_token(scopes: list[str] = SCOPES):
+    key = (CLIENT_ID, TENANT_ID, tuple(scopes))
+    if key in _MEM and _MEM[key][1] - time.time() > TOKEN_REFRESH_MARGIN:
+        return _MEM[key][0]
+
+    # Merge the cache file before either flow writes to the shared cache, so saving it on exit
+    # can't replace the stored user login with only what this run acquired
+    load_cache()
+    if AUTH_FLOW == "client_credentials":
+        token = acquire_app_token(scopes)
+    else:
+        token = acquire_user_token(scopes)
+
+    if token:
+        _MEM[key] = (token, _token_expiry(token))
+
+    return token
+
+def acquire_app_token(scopes: list[str] = SCOPES):
+    """Acquires an app-only token with the client credentials flow."""
+    global _confidential_app
+    # Keep one application so MSAL's in-memory cache serves repeat calls without network I/O
+    if _confidential_app is None:
+        _confidential_app = msal.ConfidentialClientApplication(
+            CLIENT_ID,
+            authority=AUTHORITY,
+            client_credential=os.environ["CLIENT_SECRET"],
+            token_cache=cache,
+        )
+    response = _confidential_app.acquire_token_for_client(scopes=scopes)
+    if "access_token" not in response:
+        logger.error(f"Error acquiring app token: {response.get('error_description')}")
+    return response.get("access_token")
+
+def acquire_user_token(scopes: list[str] = SCOPES):
+    """Acquires a delegated token silently from the cache, falling back to an interactive login."""
+    load_cache()
 
     pca = PublicClientApplication(
         client_id=CLIENT_ID,
@@ -55,7 +136,7 @@ def acquire_token():
     )
 
     token_request = {
-        "scopes": SCOPES,
+        "scopes": scopes,
     }
 
     accounts = pca.get_accounts()
@@ -82,17 +163,24 @@ def acquire_token():
 
     return token
 
-    def acquire_non_interactive_token(tenant_id, client_id, client_secret):
-        # Acquires an access token using client credentials flow.
-        token_url = f"login.microsoftonline.com{tenant_id}/oauth2/v2.0/token"
-        payload = {
-            'client_id': client_id,
-            'client_secret': client_secret,
-            'scope': 'https://graph.microsoft.com/.default',
-            'grant_type': 'client_credentials'
-        }
-        headers = {'Content-Type': 'application/x-www-form-urlencoded'}
-
-        response = requests.post(token_url, data=payload, headers=headers)
-        response.raise_for_status()
-        return response.json().get('access_token')
\ No newline at end of file
+class TokenProvider:
+    """
+    Hands out Graph access tokens to the plugins. Tokens come from the in-memory copy
+    and are only refreshed through MSAL when they are within TOKEN_REFRESH_MARGIN of expiry.
+    """
+
+    def get_token(self, scopes: list[str] | None = None) -> str:
+        token = acquire_token(scopes or SCOPES)
+        if not token:
+            raise Exception(f"Could not acquire token")
+        return token
+
+    def cached_token(self, scopes: list[str] | None = None) -> str | None:
+        """Returns the in-memory token if it is still fresh, without touching MSAL or the network."""
+        entry = _MEM.get((CLIENT_ID, TENANT_ID, tuple(scopes or SCOPES)))
+        if entry and entry[1] - time.time() > TOKEN_REFRESH_MARGIN:
+            return entry[0]
+        return None
+
+# Shared by every plugin so they all reuse the same cached token
+token_provider = TokenProvider()
@@ -0,0 +1,178 @@
+import asyncio
+import atexit
+import email.utils
+import functools
+import logging
+import random
+import time
+import httpx
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from .auth import TokenProvider, token_provider as default_token_provider
+
+logger = logging.getLogger(__name__)
+
+# Copilot can take a while to answer, so only the connect phase gets a tight timeout
+GRAPH_TIMEOUT = httpx.Timeout(120.0, connect=10.0)
+# Throttling and transient gateway failures are retried here rather than surfaced to the model,
+# whose replanning costs far more than a backoff sleep
+RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+# POSTs (Copilot chat, $batch) are not idempotent: a gateway error may come back after Graph already
+# processed the prompt, so they are only retried when Graph said it did not process them
+THROTTLE_STATUSES = frozenset({429, 503})
+GRAPH_RETRIES = 5
+# Waits grow as 0.5, 1, 2, 4... seconds plus up to RETRY_BACKOFF_JITTER of random spread;
+# a Retry-After header from Graph takes precedence
+RETRY_BACKOFF_FACTOR = 0.5
+RETRY_BACKOFF_JITTER = 0.5
+RETRY_BACKOFF_MAX = 120
+# Default headers for Graph calls; requests with other bodies (e.g. file uploads) override Content-Type
+GRAPH_HEADERS = {
+    "Content-Type": "application/json"
+}
+
+class GraphAuth(httpx.Auth):
+    """
+    Attaches a current bearer token to every request, so long-running sessions survive token expiry.
+    Works both as an httpx auth and, through __call__, as a requests auth.
+    On the async client, refreshes run in a worker thread so they never block the event loop.
+    """
+
+    def __init__(self, token_provider: TokenProvider):
+        self._token_provider = token_provider
+        # Serializes refreshes on the event loop, so concurrent requests wait for one refresh instead of each starting their own
+        self._refresh_lock = asyncio.Lock()
+
+    def _auth_header(self) -> str:
+        return f"Bearer {self._token_provider.get_token()}"
+
+    def auth_flow(self, request):
+        request.headers["Authorization"] = self._auth_header()
+        yield request
+
+    async def async_auth_flow(self, request):
+        token = self._token_provider.cached_token()
+        if token is None:
+            async with self._refresh_lock:
+                # A refresh may block on MSAL network I/O or an interactive browser login, so it runs off the loop
+                token = self._token_provider.cached_token() or await asyncio.to_thread(self._token_provider.get_token)
+        request.headers["Authorization"] = f"Bearer {token}"
+        yield request
+
+    def __call__(self, request):
+        request.headers["Authorization"] = self._auth_header()
+        return request
+
+def retry_delay(headers, attempt: int) -> float:
+    """Seconds to wait before retry attempt + 1: Graph's Retry-After when it gave one, else backoff with jitter."""
+    retry_after = headers.get("Retry-After") or headers.get("retry-after")
+    if retry_after:
+        if str(retry_after).isdigit():
+            return float(retry_after)
+        try:
+            return max(0.0, email.utils.parsedate_to_datetime(retry_after).timestamp() - time.time())
+        except (TypeError, ValueError):
+            pass
+    backoff = RETRY_BACKOFF_FACTOR * 2 ** attempt + random.uniform(0, RETRY_BACKOFF_JITTER)
+    return min(backoff, RETRY_BACKOFF_MAX)
+
+def retry_statuses(method: str) -> frozenset[int]:
+    return THROTTLE_STATUSES if method == "POST" else RETRY_STATUSES
+
+class GraphRetry(Retry):
+    """
+    urllib3 Retry that re-sends POSTs only on throttling, see THROTTLE_STATUSES.
+    POSTs are never retried after a read error either: the server may already have the body,
+    and the async client's transport doesn't retry those failures for any method.
+    """
+
+    def is_retry(self, method, status_code, has_retry_after=False):
+        if status_code not in retry_statuses(method):
+            return False
+        return super().is_retry(method, status_code, has_retry_after)
+
+    def increment(self, method=None, url=None, response=None, error=None, _pool=None, _stacktrace=None):
+        if method == "POST" and error is not None and self._is_read_error(error):
+            raise error.with_traceback(_stacktrace)
+        return super().increment(method, url, response, error, _pool, _stacktrace)
+
+def create_graph_session(headers: dict, auth: GraphAuth) -> requests.Session:
+    """Creates a keep-alive session whose pooled, retrying adapter is shared by every Graph call made through it."""
+    session = requests.Session()
+    session.mount("https://", HTTPAdapter(
+        pool_connections=10,
+        pool_maxsize=20,
+        max_retries=GraphRetry(
+            total=GRAPH_RETRIES,
+            backoff_factor=RETRY_BACKOFF_FACTOR,
+            backoff_jitter=RETRY_BACKOFF_JITTER,
+            backoff_max=RETRY_BACKOFF_MAX,
+            status_forcelist=RETRY_STATUSES,
+            # Graph's Copilot chat and upload calls are POST/PUT, which urllib3 won't retry by default
+            allowed_methods=frozenset({"GET", "POST", "PUT", "DELETE"}),
+            respect_retry_after_header=True,
+            # Hand back the last response once retries run out, so raise_for_status reports the real status
+            raise_on_status=False,
+        ),
+    ))
+    session.headers.update(headers)
+    session.auth = auth
+    return session
+
+class RetryTransport(httpx.AsyncBaseTransport):
+    """
+    Retries throttled and transiently failed Graph responses with exponential backoff and jitter,
+    the async counterpart of the urllib3 Retry mounted on the session.
+    """
+
+    def __init__(self, transport: httpx.AsyncBaseTransport):
+        self._transport = transport
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        for attempt in range(GRAPH_RETRIES + 1):
+            response = await self._transport.handle_async_request(request)
+            # Only bodies held in memory can be sent again; streamed uploads are returned as they are
+            if (
+                response.status_code not in retry_statuses(request.method)
+                or attempt == GRAPH_RETRIES
+                or not isinstance(request.stream, httpx.ByteStream)
+            ):
+                return response
+            delay = retry_delay(response.headers, attempt)
+            await response.aclose()
+            logger.debug("Graph returned %s for %s %s, retrying in %.1fs", response.status_code, request.method, request.url, delay)
+            await asyncio.sleep(delay)
+        return response
+
+    async def aclose(self):
+        await self._transport.aclose()
+
+def create_graph_async_client(headers: dict, auth: GraphAuth) -> httpx.AsyncClient:
+    """Creates a pooled async client for Graph calls made from the event loop."""
+    # HTTP/2 lets parallel tool calls share one TLS connection (needs httpx[http2]).
+    # The inner transport also retries failed connection attempts; limits and http2 must be set on it
+    # because a client ignores its own when given a transport.
+    transport = httpx.AsyncHTTPTransport(
+        http2=True,
+        limits=httpx.Limits(max_connections=8, max_keepalive_connections=8, keepalive_expiry=75),
+        retries=3,
+    )
+    return httpx.AsyncClient(
+        transport=RetryTransport(transport),
+        headers=headers,
+        auth=auth,
+        timeout=GRAPH_TIMEOUT,
+    )
+
+@functools.lru_cache(maxsize=1)
+def get_session() -> requests.Session:
+    """Returns the process-wide Graph session used by every plugin's blocking calls."""
+    session = create_graph_session(GRAPH_HEADERS, GraphAuth(default_token_provider))
+    atexit.register(session.close)
+    return session
+
+@functools.lru_cache(maxsize=1)
+def get_async_client() -> httpx.AsyncClient:
+    """Returns the process-wide async Graph client, so chat, delete and uploads share one connection."""
+    return create_graph_async_client(GRAPH_HEADERS, GraphAuth(default_token_provider))
@@ -1,16 +1,16 @@
 import atexit
+import functools
 from rich import print
 from rich.console import Console
+from rich.logging import RichHandler
 from rich.panel import Panel
 from rich.text import Text
-from rich.prompt import Prompt
-import requests
+import orjson
 import os   
 import asyncio
-import json
-import time
-from src.auth import *   
-from src.tooling import M365CopilotPlugin, LocalDocumentGeneratorPlugin, GraphSharePointUploaderPlugin
+from src.auth import save_cache_on_exit, token_provider
+from src.http_client import get_async_client
+from src.tooling import M365CopilotPlugin, LocalDocumentGeneratorPlugin, GraphSharePointUploaderPlugin, CopilotDocumentPipelinePlugin
 import sys
 import logging
 from dotenv import load_dotenv
@@ -19,16 +19,21 @@ from semantic_kernel.connectors.ai.open_ai import AzureChatCompletion
 from semantic_kernel.connectors.ai.open_ai import AzureChatPromptExecutionSettings
 from semantic_kernel.connectors.ai.function_choice_behavior import FunctionChoiceBehavior
 from semantic_kernel.contents import ChatHistory
-
-# --- Configure Logging to verify which plugin is triggered ---
-logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
-logging.getLogger("semantic_kernel").setLevel(logging.DEBUG) # Use DEBUG for maximum detail on function calls
-
+from semantic_kernel.functions import KernelPlugin
 
 # Using the beta endpoint for the Chat API
 load_dotenv()
 console = Console()
 
+# --- Configure Logging to verify which plugin is triggered ---
+# Logs share the console with the status spinner; markup parsing is skipped as records are plain text
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(name)s - %(message)s',
+    handlers=[RichHandler(console=console, rich_tracebacks=False, markup=False)]
+)
+logging.getLogger("semantic_kernel").setLevel(os.getenv("SK_LOG_LEVEL", "INFO").upper()) # Set SK_LOG_LEVEL=DEBUG for maximum detail on function calls
+
 # --- 1. Configuration (Use environment variables) ---
 # Ensure AZURE_AI_ENDPOINT, AZURE_AI_KEY, AZURE_AI_MODEL, SHAREPOINT environment variables are set.
 global GRAPH_API_URL, AZURE_AI_ENDPOINT, AZURE_AI_KEY, AZURE_AI_MODEL, SITE_URL, FOLDER
@@ -55,31 +60,46 @@ def display_message(user, message, color="cyan"):
     console.print(panel)
 
 async def ainput(string: str) -> str:
-    await asyncio.get_event_loop().run_in_executor(
-        None, lambda s=string: sys.stdout.write(s + " ")
-    )
-    return await asyncio.get_event_loop().run_in_executor(None, sys.stdin.readline)
+    await asyncio.to_thread(sys.stdout.write, string + " ")
+    return await asyncio.to_thread(sys.stdin.readline)
 
-def get_access_token():
-    if acquire_token():
-        return acquire_token()
-    else:
-        raise Exception(f"Could not acquire token")
+# An empty body is required to create a new conversation
+_EMPTY_BODY = b"{}"
 
-def create_conversation(token):
+async def create_conversation():
     """Creates a new Copilot conversation and returns its ID."""
-    headers = {
-        "Authorization": f"Bearer {token}",
-        "Content-Type": "application/json"
-    }
-    # An empty body is required to create a new conversation
-    response = requests.post(f"{GRAPH_API_URL}/conversations", headers=headers, data=json.dumps({}))
-    #print(f"Response: {response.json()}")
+    # Goes through the shared Graph client, whose connection the plugins then keep using
+    response = await get_async_client().post(f"{GRAPH_API_URL}/conversations", content=_EMPTY_BODY)
+    #print(f"Response: {response.content}")
     response.raise_for_status()
-    conversation_data = response.json()
+    conversation_data = orjson.loads(response.content)
     print(f"Created conversation with ID: {conversation_data['id']}")
     return conversation_data["id"]
 
+@functools.lru_cache(maxsize=None)
+def _build_plugins():
+    """
+    Creates the plugin singletons and their KernelPlugin wrappers once per process, so
+    Semantic Kernel's function introspection doesn't rerun on every main() entry.
+    The plugins hold event-loop-bound state (the shared httpx.AsyncClient's connections, the
+    Copilot plugin's prompt queue, semaphore and drainer task), so reuse is only safe while every
+    main() runs on the same loop, i.e. under one asyncio.Runner as in __main__ below. Calling
+    asyncio.run(main()) repeatedly would hand a new loop connections opened on a closed one.
+    """
+    instances = {
+        "M365CopilotChat": M365CopilotPlugin(),
+        "LocalDocumentGeneratorPlugin": LocalDocumentGeneratorPlugin(),
+    }
+    instances["GraphSharePointUploaderPlugin"] = GraphSharePointUploaderPlugin(
+        generator_plugin=instances["LocalDocumentGeneratorPlugin"],
+    )
+    instances["CopilotDocumentPipelinePlugin"] = CopilotDocumentPipelinePlugin(
+        copilot_plugin=instances["M365CopilotChat"],
+        uploader_plugin=instances["GraphSharePointUploaderPlugin"],
+    )
+    plugins = [KernelPlugin.from_object(plugin_name=name, plugin_instance=plugin) for name, plugin in instances.items()]
+    return instances, plugins
+
 async def main():
     """
     Main orchestration script using Semantic Kernel configured with an Azure AI Foundry model
@@ -89,11 +109,11 @@ async def main():
 
     # --- 2. Acquire Graph Access Token ---
     console.print("[blue] Acquiring Graph Access Token...[/]")
-    os.environ["M365_TOKEN"] = get_access_token()
+    os.environ["M365_TOKEN"] = token_provider.get_token()
 
     # --- 3. Create Conversation ---
     console.print("[green] Creating Conversation...[/]")
-    os.environ["M365_CONVO_ID"] = create_conversation(os.environ["M365_TOKEN"])
+    os.environ["M365_CONVO_ID"] = await create_conversation()
 
    # --- 7. Check Required Environment Variables ---
     console.print("[blue] Checking Required Environment Variables...[/]")
@@ -115,23 +135,23 @@ async def main():
     )
     kernel.add_service(azure_chat_service)
 
+    # Let the model request several tools in one turn; the kernel awaits the
+    # resulting invocations together, so their Graph calls overlap
     execution_settings = AzureChatPromptExecutionSettings(
-        function_choice_behavior=FunctionChoiceBehavior.Auto(auto_invoke=True)
-    ) 
+        function_choice_behavior=FunctionChoiceBehavior.Auto(auto_invoke=True),
+        parallel_tool_calls=True,
+    )
 
     console.print(f"[bright_green] Adding Chat History...[/]")
     history = ChatHistory(system_message="You are a assistant agent and your role is to help with documentations and information from Office 365.")
 
     # --- 6. Import the Plugin ---
     console.print(f"[green] Importing Plugin...[/]")
-    m365copilot_chat_plugin = M365CopilotPlugin()
-    kernel.add_plugin(plugin_name="M365CopilotChat", plugin=m365copilot_chat_plugin)
-    
-    local_document_generator_plugin = LocalDocumentGeneratorPlugin()
-    kernel.add_plugin(plugin_name="LocalDocumentGeneratorPlugin", plugin=local_document_generator_plugin)
-    
-    graph_sharepoin_uploader_plugin = GraphSharePointUploaderPlugin(generator_plugin=local_document_generator_plugin)
-    kernel.add_plugin(plugin_name="GraphSharePointUploaderPlugin", plugin=graph_sharepoin_uploader_plugin)
+    instances, plugins = _build_plugins()
+    # The singletons outlive this run, so point them at the current conversation
+    instances["M365CopilotChat"].rebind(os.environ["M365_CONVO_ID"])
+    for plugin in plugins:
+        kernel.add_plugin(plugin)
 
     console.print(f"[bold magenta] Kernel initialized and ready for input. Type 'exit' to quit.[/]")
 
@@ -148,18 +168,17 @@ async def main():
         if not user_prompt:
             continue
 
-        display_message("\n<<< M365 Copilot", f"Thinking.....", color="cyan")
-
         # Invoke the kernel: the LLM automatically decides to call the appropriate plugin function
         try:
             # result = await kernel.invoke_prompt(prompt=user_prompt, settings=execution_settings)
             # 5. Get Content (The Kernel handles Azure tool-calling loops automatically)
             history.add_user_message(user_prompt)
-            result = await azure_chat_service.get_chat_message_content(
-                chat_history=history,
-                settings=execution_settings,
-                kernel=kernel
-            )
+            with console.status("[cyan]Thinking...[/]"):
+                result = await azure_chat_service.get_chat_message_content(
+                    chat_history=history,
+                    settings=execution_settings,
+                    kernel=kernel
+                )
             display_message("\n<<< M365 Copilot", f"{result}", color="blue")
         except Exception as e:
             print(f"[bold red] An error occurred during AI invocation: {e}[/]")
@@ -173,5 +192,7 @@ async def main():
 
 
 if __name__ == "__main__":
-    # Run the main asynchronous function using asyncio
-    asyncio.run(main())
\ No newline at end of file
+    # Run the main asynchronous function; the Runner keeps one loop and executor for its lifetime,
+    # which the cached plugins from _build_plugins() rely on
+    with asyncio.Runner() as runner:
+        runner.run(main())
@@ -1,93 +1,439 @@
-import io, urllib
-import json
+import io
+import asyncio
+import functools
+import logging
 import os
-from dotenv import load_dotenv
+import re
+import time
+import uuid
+import zipfile
+from xml.sax.saxutils import escape as xml_escape
+import httpx
+import orjson
 import requests
-from typing import Annotated, Optional 
-from docx import Document
+from typing import Annotated, AsyncIterator
 from semantic_kernel.functions.kernel_function_decorator import kernel_function
+from .http_client import GRAPH_RETRIES, THROTTLE_STATUSES, get_async_client, get_session, retry_delay
+from .config import GRAPH_API_URL
 
-load_dotenv()
+logger = logging.getLogger(__name__)
+
+# Graph accepts at most 20 requests in a single JSON batch
+GRAPH_BATCH_LIMIT = 20
+# Prompts sent to Copilot within this window are coalesced into one $batch round-trip
+BATCH_WINDOW_SECONDS = 0.05
+# Graph starts throttling aggressively above roughly ten concurrent requests per client
+MAX_CONCURRENT_GRAPH_REQUESTS = 8
+# Upload session fragments must be multiples of 320 KiB; 10 MiB is exactly 32 of them
+UPLOAD_CHUNK_SIZE = 32 * 320 * 1024
+# Graph recommends an upload session instead of a single PUT for files larger than 4 MiB
+SIMPLE_UPLOAD_MAX_BYTES = 4 * 1024 * 1024
+# Generated documents that are never uploaded are evicted oldest-first beyond this many
+MAX_PENDING_DOCUMENTS = 16
+SSE_HEADERS = {"Accept": "text/event-stream"}
+DOCX_HEADERS = {
+    'Content-Type': 'application/vnd.openxmlformats-officedocument.wordprocessingml.document' # MIME type for .docx
+}
 
 class M365CopilotPlugin:
     """
     A plugin to interact with the Microsoft Graph Beta Copilot Chat API.
-    Assumes a valid delegated access token and conversation ID are provided upon initialization.
+    Assumes a conversation ID is provided upon initialization; Graph clients are shared unless injected.
     """
 
-    def __init__(self):
+    def __init__(
+        self,
+        session: requests.Session | None = None,
+        async_client: httpx.AsyncClient | None = None,
+    ):
         # We store necessary context when the plugin is initialized in Python
-        self.token = os.getenv("M365_TOKEN")
-        self.conversation_id = os.getenv("M365_CONVO_ID")
-        # Define headers used for all requests within this plugin
-        self.headers = {
-            "Authorization": f"Bearer {self.token}",
-            "Content-Type": "application/json"
-        }
+        self._set_conversation(os.getenv("M365_CONVO_ID"))
         self.last_copilot_response: str = ""
+        # Constant fragment shared by every chat payload
+        self._loc_hint = {"timeZone": "America/New_York"}
+        # Everything but the prompt is constant, so encode it once and splice each prompt in front of it
+        static_payload = self._build_payload("")
+        del static_payload["message"]
+        self._payload_tail = b"}," + orjson.dumps(static_payload)[1:]
+        # Keep-alive session so repeated calls reuse the TLS connection to Graph
+        self._session = session or get_session()
+        # Pooled async client so Copilot calls don't block the kernel's event loop
+        self._async_client = async_client or get_async_client()
+        # Prompts waiting to be flushed by the coalescing task, as (prompt, future) pairs
+        self._pending: asyncio.Queue = asyncio.Queue()
+        self._drainer: asyncio.Task | None = None
+        # Flushes still waiting on Graph; held here so the event loop doesn't drop them mid-flight
+        self._flushes: set[asyncio.Task] = set()
+        # Caps in-flight Graph requests when the kernel runs tool calls in parallel
+        self._sem = asyncio.Semaphore(MAX_CONCURRENT_GRAPH_REQUESTS)
 
-    @kernel_function(
-        description="Sends a prompt to the M365 Copilot for requesting any data from Outlook, mails, SharePoint, One Note, One Drive, and waits for the response. Use this to get content, answers, or summaries that will be used in subsequent steps (like creating a document).",
-        name="sendMessageToCopilot"
-    )
-    def send_message_sync(
-        self,
-        prompt_text: Annotated[str, "The specific text prompt to send to the M365 Copilot service."]
-    ) -> Annotated[str, "The text response from Copilot. You MUST capture this output to use as the 'content' argument for document generation tools."]:
+    def rebind(self, conversation_id: str):
         """
-        Sends a single message to an existing conversation via the Graph API sync chat endpoint.
+        Points the plugin at a new conversation without rebuilding its connection pools.
+        The async client, queue and semaphore stay bound to the loop they were first used on.
         """
-        url = f"{os.getenv('GRAPH_API_URL')}/conversations/{self.conversation_id}/chat"
-        
-        payload = {
+        self._set_conversation(conversation_id)
+
+    def _set_conversation(self, conversation_id: str):
+        # Resolve every endpoint once per conversation rather than on each call
+        base = GRAPH_API_URL.rstrip("/")
+        self.conversation_id = conversation_id
+        self._convo_url = f"{base}/conversations/{conversation_id}"
+        self._chat_url = f"{self._convo_url}/chat"
+        self._stream_url = f"{self._convo_url}/chatOverStream"
+        # Batched request URLs are relative to the API version, e.g. /copilot/conversations/...
+        root, resource = base.rsplit("/", 1)
+        self._batch_url = f"{root}/$batch"
+        self._batch_chat_path = f"/{resource}/conversations/{conversation_id}/chat"
+
+    def _build_payload(self, prompt_text: str) -> dict:
+        return {
             "message": {
                 "text": prompt_text
             },
             "additionalContext": [{
                 "text": "Respond in high class British English used by gentlemen of the 18th century. " # Changed from 'America/New_York' to generic UTC
             }],
-            "locationHint": {
-                "timeZone": "America/New_York"
-            }
+            "locationHint": self._loc_hint
         }
 
+    def _encode_payload(self, prompt_text: str) -> bytes:
+        """Returns the JSON body of a chat request, equivalent to orjson.dumps(self._build_payload(prompt_text))."""
+        return b'{"message":{"text":' + orjson.dumps(prompt_text) + self._payload_tail
+
+    def _reply_text(self, response_data) -> str | None:
+        # The structure of the response might be complex. This attempts to extract the relevant text.
         try:
-            # We use requests.post (synchronous) here as kernel functions are often expected to be sync 
-            # unless running in a fully async main loop (which your original code suggested with 'await', but requests library is sync)
-            response = requests.post(url, headers=self.headers, data=json.dumps(payload))
-            #response.raise_for_status() # Raise exception for bad status codes
-            response_data = response.json()
-            print(response_data)
-            # The structure of the response might be complex. This attempts to extract the relevant text.
-            try:
-                copilot_response_text = response_data['messages'][1]['text']
-                self.last_copilot_response = copilot_response_text
-                return copilot_response_text
-            except (KeyError, IndexError):
-                return f"Error: Could not extract specific message text from response. Full data: {json.dumps(response_data)}"
+            copilot_response_text = response_data['messages'][1]['text']
+        except (KeyError, IndexError, TypeError):
+            return None
+        self.last_copilot_response = copilot_response_text
+        return copilot_response_text
 
-        except requests.exceptions.RequestException as e:
-            # Handle connection or HTTP errors gracefully
-            return f"Error connecting to M365 Graph API: {e}"
+    def _extract_reply(self, raw: bytes) -> str:
+        """Returns Copilot's answer from a raw chat response body."""
+        copilot_response_text = self._reply_text(orjson.loads(raw))
+        if copilot_response_text is None:
+            # Report the body as received rather than re-serializing what was just parsed
+            return f"Error: Could not extract specific message text from response. Full data: {raw.decode('utf-8', 'replace')}"
+        return copilot_response_text
 
-    @kernel_function(description="Terminates the current session and deletes conversation context. Call this ONLY when the user explicitly says 'exit', 'quit', or 'goodbye'.")
-    def end_conversation(self) -> str:
-        """Deletes the conversation resource."""
-        url = f"{os.getenv('GRAPH_API_URL')}/conversations/{self.conversation_id}"
+    def _build_batches(self, prompts: list[str]) -> list[dict[str, dict]]:
+        """
+        Returns the $batch sub-requests for prompts, at most GRAPH_BATCH_LIMIT per batch, keyed by id.
+        Each id is the prompt's index in prompts, so replies can be matched back regardless of response order.
+        """
+        return [
+            {
+                str(i): {
+                    "id": str(i),
+                    "method": "POST",
+                    "url": self._batch_chat_path,
+                    "headers": {"Content-Type": "application/json"},
+                    "body": self._build_payload(prompt),
+                }
+                for i, prompt in enumerate(prompts[start:start + GRAPH_BATCH_LIMIT], start)
+            }
+            for start in range(0, len(prompts), GRAPH_BATCH_LIMIT)
+        ]
+
+    def _take_batch_replies(
+        self, batch_data: dict, sent: dict[str, dict], replies: list[str | None], attempt: int
+    ) -> tuple[dict[str, dict], float]:
+        """
+        Stores the Copilot replies of a $batch response in replies, at the index given by each request id.
+        Entries whose request got no response are left as None.
+        Graph throttles batched requests individually under an outer 200, so throttled sub-requests are
+        returned along with how long to wait before sending them again.
+        """
+        throttled: dict[str, dict] = {}
+        delay = 0.0
+        for item in batch_data.get("responses", []):
+            request_id = item.get("id")
+            if request_id not in sent:
+                continue
+            if item.get("status") in THROTTLE_STATUSES:
+                throttled[request_id] = sent[request_id]
+                delay = max(delay, retry_delay(item.get("headers") or {}, attempt))
+                continue
+            body = item.get("body", {})
+            if item.get("status", 500) >= 400:
+                replies[int(request_id)] = f"Error: Copilot request failed with status {item.get('status')}: {orjson.dumps(body).decode()}"
+                continue
+            reply = self._reply_text(body)
+            if reply is None:
+                reply = f"Error: Could not extract specific message text from response. Full data: {orjson.dumps(body).decode()}"
+            replies[int(request_id)] = reply
+        return throttled, delay
+
+    @staticmethod
+    def _require_replies(replies: list[str | None]) -> list[str]:
+        missing = [i for i, reply in enumerate(replies) if reply is None]
+        if missing:
+            raise RuntimeError(f"Graph $batch response contained no reply for prompts {missing}, or they stayed throttled")
+        return replies
+
+    def send_message_sync(
+        self,
+        prompt_text: Annotated[str, "The specific text prompt to send to the M365 Copilot service."]
+    ) -> Annotated[str, "The text response from Copilot."]:
+        """
+        Sends a single message to an existing conversation via the Graph API sync chat endpoint.
+        Blocking variant for callers outside the event loop; the kernel uses send_message_async.
+        """
+        body = self._encode_payload(prompt_text)
+
+        # Content-Type is already set on the session, so the pre-encoded bytes go out as-is.
+        # Throttling is retried by the session; anything still failing raises to the caller
+        response = self._session.post(self._chat_url, data=body)
+        response.raise_for_status()
+        logger.debug("Copilot response: %s", response.content)
+        return self._extract_reply(response.content)
+
+    def send_messages_batch(
+        self,
+        prompts: Annotated[list[str], "The independent prompts to send to the M365 Copilot service."]
+    ) -> Annotated[list[str], "The text responses from Copilot, in the same order as the prompts."]:
+        """
+        Sends several prompts using Graph JSON batching, one round-trip per GRAPH_BATCH_LIMIT prompts.
+        Blocking variant for callers outside the event loop; the kernel uses send_messages_batch_async.
+        """
+        replies: list[str | None] = [None] * len(prompts)
+        for batch in self._build_batches(prompts):
+            for attempt in range(GRAPH_RETRIES + 1):
+                response = self._session.post(self._batch_url, data=orjson.dumps({"requests": list(batch.values())}))
+                response.raise_for_status()
+                batch, delay = self._take_batch_replies(orjson.loads(response.content), batch, replies, attempt)
+                if not batch or attempt == GRAPH_RETRIES:
+                    break
+                time.sleep(delay)
+        return self._require_replies(replies)
+
+    @kernel_function(
+        description="Sends a prompt to the M365 Copilot for requesting any data from Outlook, mails, SharePoint, One Note, One Drive, and waits for the response. Use this to get content, answers, or summaries that will be used in subsequent steps (like creating a document).",
+        name="sendMessageToCopilot"
+    )
+    async def send_message_async(
+        self,
+        prompt_text: Annotated[str, "The specific text prompt to send to the M365 Copilot service."]
+    ) -> Annotated[str, "The text response from Copilot. You MUST capture this output to use as the 'content' argument for document generation tools."]:
+        """
+        Sends a single message to an existing conversation without blocking the event loop.
+        Prompts arriving within BATCH_WINDOW_SECONDS of each other share one $batch request.
+        """
+        reply = asyncio.get_running_loop().create_future()
+        self._pending.put_nowait((prompt_text, reply))
+        if self._drainer is None or self._drainer.done():
+            self._drainer = asyncio.create_task(self._drain_pending())
+        return await reply
+
+    @kernel_function(
+        description="Sends two or more independent prompts to the M365 Copilot in a single request. Prefer this over repeated sendMessageToCopilot calls when several unrelated questions are needed at once.",
+        name="sendMessagesToCopilotBatch"
+    )
+    async def send_messages_batch_async(
+        self,
+        prompts: Annotated[list[str], "The independent prompts to send to the M365 Copilot service."]
+    ) -> Annotated[list[str], "The text responses from Copilot, in the same order as the prompts."]:
+        """
+        Sends several prompts using Graph JSON batching without blocking the event loop.
+        """
+        return self._require_replies(await self._send_batch_async(prompts))
+
+    async def _send_batch_async(self, prompts: list[str]) -> list[str | None]:
+        """
+        Returns one reply per prompt, or None where the $batch response had nothing for it.
+        Throttled sub-requests are sent again on their own, up to GRAPH_RETRIES times.
+        """
+        replies: list[str | None] = [None] * len(prompts)
+        for batch in self._build_batches(prompts):
+            for attempt in range(GRAPH_RETRIES + 1):
+                async with self._sem:
+                    response = await self._async_client.post(self._batch_url, content=orjson.dumps({"requests": list(batch.values())}))
+                response.raise_for_status()
+                batch, delay = self._take_batch_replies(orjson.loads(response.content), batch, replies, attempt)
+                if not batch or attempt == GRAPH_RETRIES:
+                    break
+                await asyncio.sleep(delay)
+        return replies
+
+    async def _post_chat_async(self, prompt_text: str) -> str:
+        body = self._encode_payload(prompt_text)
+
+        async with self._sem:
+            response = await self._async_client.post(self._chat_url, content=body)
+        response.raise_for_status()
+        logger.debug("Copilot response: %s", response.content)
+        return self._extract_reply(response.content)
+
+    async def stream_message(self, prompt_text: str) -> AsyncIterator[str]:
+        """Yields Copilot's answer piece by piece as the chatOverStream endpoint produces it."""
+        received = ""
+        async with self._sem:
+            async with self._async_client.stream("POST", self._stream_url, content=self._encode_payload(prompt_text), headers=SSE_HEADERS) as response:
+                response.raise_for_status()
+                # Each server-sent event carries the conversation so far; only the new text is passed on
+                async for line in response.aiter_lines():
+                    if not line.startswith("data:"):
+                        continue
+                    text = self._reply_text(orjson.loads(line[5:])) or ""
+                    if text.startswith(received):
+                        delta, received = text[len(received):], text
+                    else:
+                        delta, received = text, received + text
+                    if delta:
+                        yield delta
+        self.last_copilot_response = received
+
+    async def _drain_pending(self):
+        """
+        Collects queued prompts one BATCH_WINDOW_SECONDS window at a time and flushes each window
+        in its own task, so prompts arriving while an earlier flush is in flight are not held back by it.
+        """
+        while not self._pending.empty():
+            await asyncio.sleep(BATCH_WINDOW_SECONDS)
+            waiting = [self._pending.get_nowait() for _ in range(self._pending.qsize())]
+            flush = asyncio.create_task(self._flush(waiting))
+            self._flushes.add(flush)
+            flush.add_done_callback(self._flushes.discard)
+
+    async def _flush(self, waiting: list[tuple[str, asyncio.Future]]):
+        """Sends one window's prompts, as a single chat call or one $batch, and settles their futures."""
+        prompts = [prompt for prompt, _ in waiting]
         try:
-            response = requests.delete(url, headers=self.headers)
-            response.raise_for_status()
-            return f"Conversation {self.conversation_id} successfully ended/deleted."
-        except requests.exceptions.RequestException as e:
-            return f"Error ending conversation: {e}"
+            if len(prompts) == 1:
+                replies = [await self._post_chat_async(prompts[0])]
+            else:
+                replies = await self._send_batch_async(prompts)
+        except Exception as e:
+            for _, reply in waiting:
+                if not reply.done():
+                    reply.set_exception(e)
+        else:
+            # Every future is settled, including those whose prompt got no response, so no caller hangs
+            for (_, reply), text in zip(waiting, replies):
+                if reply.done():
+                    continue
+                if text is None:
+                    reply.set_exception(RuntimeError("Graph $batch response contained no reply for this prompt"))
+                else:
+                    reply.set_result(text)
+
+    @kernel_function(description="Terminates the current session and deletes conversation context. Call this ONLY when the user explicitly says 'exit', 'quit', or 'goodbye'.")
+    async def end_conversation(self) -> str:
+        """Deletes the conversation resource over the shared async client."""
+        async with self._sem:
+            response = await self._async_client.delete(self._convo_url)
+        response.raise_for_status()
+        return f"Conversation {self.conversation_id} successfully ended/deleted."
+
+@functools.lru_cache(maxsize=1)
+def _get_docx_module():
+    """Imports python-docx (and lxml behind it) on first use, so Copilot-only runs never pay for it."""
+    import docx
+    return docx
+
+@functools.lru_cache(maxsize=1)
+def _template_bytes() -> bytes:
+    # python-docx parses its bundled default template on every Document() call, so keep
+    # one serialized blank document around and open new documents from these bytes instead
+    template_buf = io.BytesIO()
+    _get_docx_module().Document().save(template_buf)
+    return template_buf.getvalue()
+
+# Plain single-paragraph documents are zipped straight from static WordprocessingML parts,
+# skipping python-docx and lxml; anything with line breaks, tabs or other control
+# characters, or very long text, still goes through python-docx
+SIMPLE_DOCX_MAX_CHARS = 64_000
+# Control characters, surrogates and U+FFFE/U+FFFF are not valid in XML text
+_NEEDS_DOCX = re.compile(r"[\x00-\x1f\ud800-\udfff\ufffe\uffff]")
+_SIMPLE_DOCX_PARTS = {
+    "[Content_Types].xml": (
+        b'<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+        b'<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+        b'<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+        b'<Default Extension="xml" ContentType="application/xml"/>'
+        b'<Override PartName="/word/document.xml" ContentType="application/vnd.openxmlformats-officedocument.wordprocessingml.document.main+xml"/>'
+        b'<Override PartName="/word/styles.xml" ContentType="application/vnd.openxmlformats-officedocument.wordprocessingml.styles+xml"/>'
+        b'</Types>'
+    ),
+    "_rels/.rels": (
+        b'<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+        b'<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        b'<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" Target="word/document.xml"/>'
+        b'</Relationships>'
+    ),
+    "word/_rels/document.xml.rels": (
+        b'<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+        b'<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        b'<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/styles" Target="styles.xml"/>'
+        b'</Relationships>'
+    ),
+    # The python-docx template's document defaults (Calibri 11 pt, 1.15 line spacing), so both paths
+    # produce the same-looking text; fonts are named directly since this package carries no theme part
+    "word/styles.xml": (
+        b'<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+        b'<w:styles xmlns:w="http://schemas.openxmlformats.org/wordprocessingml/2006/main">'
+        b'<w:docDefaults>'
+        b'<w:rPrDefault><w:rPr>'
+        b'<w:rFonts w:ascii="Calibri" w:eastAsia="Calibri" w:hAnsi="Calibri" w:cs="Times New Roman"/>'
+        b'<w:sz w:val="22"/><w:szCs w:val="22"/>'
+        b'<w:lang w:val="en-US" w:eastAsia="en-US" w:bidi="ar-SA"/>'
+        b'</w:rPr></w:rPrDefault>'
+        b'<w:pPrDefault><w:pPr><w:spacing w:after="200" w:line="276" w:lineRule="auto"/></w:pPr></w:pPrDefault>'
+        b'</w:docDefaults>'
+        b'<w:style w:type="paragraph" w:default="1" w:styleId="Normal"><w:name w:val="Normal"/><w:qFormat/></w:style>'
+        b'</w:styles>'
+    ),
+}
+_SIMPLE_DOCX_BODY = (
+    b'<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    b'<w:document xmlns:w="http://schemas.openxmlformats.org/wordprocessingml/2006/main">'
+    b'<w:body><w:p><w:r><w:t xml:space="preserve">%s</w:t></w:r></w:p></w:body>'
+    b'</w:document>'
+)
+
+def _write_simple_docx(content: str) -> io.BytesIO:
+    buffer = io.BytesIO()
+    # Level 3 deflate: nearly the size of the default level for text this short, at a fraction of the CPU
+    with zipfile.ZipFile(buffer, "w", zipfile.ZIP_DEFLATED, compresslevel=3) as archive:
+        archive.writestr("[Content_Types].xml", _SIMPLE_DOCX_PARTS["[Content_Types].xml"])
+        archive.writestr("_rels/.rels", _SIMPLE_DOCX_PARTS["_rels/.rels"])
+        archive.writestr("word/document.xml", _SIMPLE_DOCX_BODY % xml_escape(content).encode("utf-8"))
+        archive.writestr("word/_rels/document.xml.rels", _SIMPLE_DOCX_PARTS["word/_rels/document.xml.rels"])
+        archive.writestr("word/styles.xml", _SIMPLE_DOCX_PARTS["word/styles.xml"])
+    buffer.seek(0)
+    return buffer
+
+def _new_document():
+    return _get_docx_module().Document(io.BytesIO(_template_bytes()))
+
+def _add_paragraphs(document, paragraphs: list[str]):
+    for paragraph in paragraphs:
+        document.add_paragraph(paragraph)
+
+def _save_document(document) -> io.BytesIO:
+    buffer = io.BytesIO()
+    document.save(buffer)
+    buffer.seek(0) # Reset buffer position to start for reading
+    return buffer
+
+def _render_document(content: str) -> io.BytesIO:
+    """Builds a single-paragraph Word document and returns it in a rewound buffer."""
+    if len(content) <= SIMPLE_DOCX_MAX_CHARS and not _NEEDS_DOCX.search(content):
+        return _write_simple_docx(content)
+    document = _new_document()
+    document.add_paragraph(content)
+    return _save_document(document)
 
 class LocalDocumentGeneratorPlugin:
     """
     Plugin solely for generating a Word document file. Use for any request to generate a word document.
     """
     def __init__(self):
-        # Store reference to the M365 plugin to access the last response
-        self.content = ""
+        # Generated documents waiting for upload, keyed by the handle returned to the caller,
+        # so parallel tool calls never overwrite each other's output
+        self._documents: dict[str, tuple[io.BytesIO, str]] = {}
 
     @kernel_function(description="Creates a Word document file (.docx) in memory containing the provided text. Use for any request to generate a word document.")
     def generate_word_document_bytes(
@@ -104,67 +450,195 @@ class LocalDocumentGeneratorPlugin:
         if not content:
             return "Error: No content provided and no previous Copilot response found to use."
 
-        # 2. Create the Word document in memory using python-docx
-        document = Document()
-        document.add_paragraph(content)
-        
-        # 2. Save document to an in-memory bytes buffer
-        buffer = io.BytesIO()
-        document.save(buffer)
-        buffer.seek(0) # Reset buffer position to start for reading
-        self.document_buffer = buffer 
-        self.filename = filename
-        # We store the buffer object locally if we wanted to process it further in Python,
-        # but for demonstration via Semantic Kernel return value, we just confirm status.
-        # document_bytes_variable = buffer.read() 
-
-        return f"Successfully generated Word document content for '{filename}' in memory (Bytes available for local use)."
+        # 2. Create the Word document in an in-memory bytes buffer using python-docx
+        buffer = _render_document(content)
+        handle = uuid.uuid4().hex
+        self.store_document(handle, buffer, filename)
+
+        return f"Successfully generated Word document content for '{filename}' in memory (handle={handle})."
+
+    def store_document(self, handle: str, buffer: io.BytesIO, filename: str):
+        """Keeps a rendered document until it is taken for upload."""
+        self._documents[handle] = (buffer, filename)
+        while len(self._documents) > MAX_PENDING_DOCUMENTS:
+            del self._documents[next(iter(self._documents))]
+
+    def take_document(self, handle: str) -> tuple[io.BytesIO, str] | None:
+        """Removes and returns the (buffer, filename) stored under handle, or None if it is unknown."""
+        return self._documents.pop(handle, None)
+
+    async def generate_word_documents_bytes(self, files: list[tuple[str, str]]) -> list[tuple[str, io.BytesIO]]:
+        """
+        Generates several Word files from (filename, content) pairs.
+        The CPU-bound rendering runs in a worker thread so it doesn't stall the event loop.
+        """
+        def render_all():
+            return [(filename, _render_document(content)) for filename, content in files]
+
+        return await asyncio.to_thread(render_all)
 
 class GraphSharePointUploaderPlugin:
     """
     Plugin for uploading in-memory bytes to SharePoint using the Microsoft Graph API and an Access Token.
     Configured using Site URL and Library Name.
     """
-    def __init__(self, generator_plugin: LocalDocumentGeneratorPlugin):
-        self.access_token = os.getenv("M365_TOKEN")
-
+    def __init__(
+        self,
+        generator_plugin: LocalDocumentGeneratorPlugin,
+        async_client: httpx.AsyncClient | None = None,
+    ):
         # Store a direct reference to the other plugin's instance
         self.generator_plugin_ref = generator_plugin 
 
+        # Uploads go through the same client as the Copilot calls, so both reuse one connection to Graph
+        self._async_client = async_client or get_async_client()
+
         # Construct the correct base URL
         self.base_url = f"{os.getenv('SITE_URL')}{os.getenv('FOLDER')}/"
 
-    @kernel_function(description="Uploads the previously generated in-memory Word document to SharePoint. Use this tool to upload the Word document created in `generate_word_document_bytes` to SharePoint.")
-    def upload_generated_file(
+    async def upload_large(self, content: bytes | memoryview, filename: str) -> dict:
+        """
+        Uploads a file through a Graph upload session in UPLOAD_CHUNK_SIZE fragments and returns the created item.
+        Graph requires the fragments in order, so they are sent one after another over the shared connection.
+        """
+        return await self.upload_fragments(await self.create_upload_session(filename), content)
+
+    async def create_upload_session(self, filename: str) -> str:
+        """Opens a Graph upload session for filename and returns its pre-authorized upload URL."""
+        response = await self._async_client.post(
+            f"{self.base_url}{filename}:/createUploadSession",
+            content=b'{"item": {"@microsoft.graph.conflictBehavior": "replace"}}',
+        )
+        response.raise_for_status()
+        return orjson.loads(response.content)["uploadUrl"]
+
+    async def upload_fragments(self, upload_url: str, content: bytes | memoryview) -> dict:
+        """Sends content to an open upload session in order and returns the created item."""
+        view = memoryview(content)
+        total = view.nbytes
+
+        for start in range(0, total, UPLOAD_CHUNK_SIZE):
+            chunk = view[start:start + UPLOAD_CHUNK_SIZE]
+            # The upload URL is pre-authorized and Graph rejects fragments that also carry a bearer token
+            response = await self._async_client.put(
+                upload_url,
+                content=bytes(chunk),
+                headers={
+                    "Content-Type": "application/octet-stream",
+                    "Content-Range": f"bytes {start}-{start + chunk.nbytes - 1}/{total}",
+                },
+                auth=None,
+            )
+            response.raise_for_status()
+        return orjson.loads(response.content)
+
+    @kernel_function(description="Uploads a previously generated in-memory Word document to SharePoint. Use this tool to upload the Word document created in `generate_word_document_bytes` to SharePoint, passing the handle it returned.")
+    async def upload_generated_file(
         self,
-        target_folder_path: Annotated[str, "The destination folder path in the SharePoint library (e.g., 'Reports' or empty string per user request)."]
+        doc_handle: Annotated[str, "The handle returned by generate_word_document_bytes for the document to upload."],
+        target_folder_path: Annotated[str, "The destination folder path in the SharePoint library (e.g., 'Reports' or empty string per user request)."] = ""
     ) -> Annotated[str, "The WebUrl of the newly uploaded file, or an error message."]:
         
         # --- THIS IS WHERE WE ACCESS THE WORD DOCUMENT VARIABLE ---
-        if self.generator_plugin_ref.document_buffer is None:
-            return "Error: No file content found in the associated generator plugin's buffer."
+        document = self.generator_plugin_ref.take_document(doc_handle)
+        if document is None:
+            return f"Error: No generated document found for handle '{doc_handle}'."
+        buffer, filename = document
             
-        file_content_bytes = self.generator_plugin_ref.document_buffer.read()
-        filename = self.generator_plugin_ref.filename
+        # getvalue() hands back the BytesIO's own storage instead of copying it like read() does,
+        # and doesn't depend on the stream position, so a failed upload can be retried
+        file_content = buffer.getvalue()
         # --------------------------------------------------------
 
-        if not file_content_bytes:
+        if not file_content:
              return "Error: Buffer was empty."
 
         # Construct the final URL with folder path and file name
         endpoint_url = f"{self.base_url}{filename}:/content"
-        print(f"SharePoint Base URL: {endpoint_url}")
+        logger.debug("SharePoint upload URL: %s", endpoint_url)
 
-        headers = {
-            'Authorization': f'Bearer {self.access_token}',
-            'Content-Type': 'application/vnd.openxmlformats-officedocument.wordprocessingml.document' # MIME type for .docx
-        }
+        try:
+            if len(file_content) > SIMPLE_UPLOAD_MAX_BYTES:
+                # Sent in UPLOAD_CHUNK_SIZE fragments, so only one fragment is copied for the wire at a time
+                uploaded_item_info = await self.upload_large(file_content, filename)
+            else:
+                # Awaited so the upload can overlap with the next Copilot prompt
+                # Authorization comes from the client's auth; httpx derives Content-Length from the bytes
+                response = await self._async_client.put(endpoint_url, content=file_content, headers=DOCX_HEADERS)
+                response.raise_for_status() 
+                uploaded_item_info = orjson.loads(response.content)
+        except httpx.HTTPError:
+            # Keep the document under the same handle so the upload can be retried
+            self.generator_plugin_ref.store_document(doc_handle, buffer, filename)
+            raise
+        return f"Success: Uploaded to {uploaded_item_info['webUrl']}"
+
+class CopilotDocumentPipelinePlugin:
+    """
+    Plugin that streams a Copilot answer into a Word document and uploads it to SharePoint in one call.
+    The steps overlap: paragraphs are written while Copilot is still answering, and the upload
+    session is opened meanwhile, so only the final save and transfer remain once the answer is complete.
+    """
+    def __init__(
+        self,
+        copilot_plugin: M365CopilotPlugin,
+        uploader_plugin: GraphSharePointUploaderPlugin,
+    ):
+        self.copilot_plugin_ref = copilot_plugin
+        self.uploader_plugin_ref = uploader_plugin
+
+    @kernel_function(
+        name="askCopilotIntoSharePointDocument",
+        description="Asks M365 Copilot a question and saves its answer as a Word document in SharePoint. Use this instead of calling sendMessageToCopilot, generate_word_document_bytes and upload_generated_file one after another when the user wants Copilot's answer stored as a document."
+    )
+    async def copilot_answer_to_sharepoint(
+        self,
+        prompt_text: Annotated[str, "The specific text prompt to send to the M365 Copilot service."],
+        filename: Annotated[str, "The name of the file to create (e.g., 'ProjectSummary.docx')."]
+    ) -> Annotated[str, "The WebUrl of the newly uploaded file, or an error message."]:
+        chunks: asyncio.Queue[str | None] = asyncio.Queue()
+        document = await asyncio.to_thread(_new_document)
+        upload_url = asyncio.create_task(self.uploader_plugin_ref.create_upload_session(filename))
+        written = 0
+
+        async def produce():
+            try:
+                async for delta in self.copilot_plugin_ref.stream_message(prompt_text):
+                    chunks.put_nowait(delta)
+            finally:
+                chunks.put_nowait(None)
+
+        async def consume():
+            nonlocal written
+            pending = ""
+            finished = False
+            while not finished:
+                # Take everything that has arrived, so each hop to the worker thread writes as much as possible
+                pieces = [await chunks.get()]
+                while not chunks.empty():
+                    pieces.append(chunks.get_nowait())
+                finished = pieces[-1] is None
+                pending += "".join(piece for piece in pieces if piece is not None)
+                # Only complete lines become paragraphs; the unfinished tail waits for more text
+                *lines, pending = pending.split("\n")
+                if finished:
+                    lines.append(pending)
+                paragraphs = [line.rstrip("\r") for line in lines if line.strip()]
+                if paragraphs:
+                    await asyncio.to_thread(_add_paragraphs, document, paragraphs)
+                    written += len(paragraphs)
 
         try:
-            response = requests.put(url=endpoint_url, data=file_content_bytes, headers=headers)
-            response.raise_for_status() 
-            uploaded_item_info = response.json()
+            await asyncio.gather(produce(), consume())
+            if not written:
+                return "Error: Copilot returned no text to write into the document."
+            # A .docx is a zip whose directory is written last, so it can only be sent once fully saved
+            buffer = await asyncio.to_thread(_save_document, document)
+            uploaded_item_info = await self.uploader_plugin_ref.upload_fragments(await upload_url, buffer.getvalue())
             return f"Success: Uploaded to {uploaded_item_info['webUrl']}"
-
-        except requests.exceptions.HTTPError as e:
-            return f"Error uploading via Graph API (Status {response.status_code}): {response.text}"
\ No newline at end of file
+        finally:
+            # An abandoned upload session simply expires on Graph's side
+            upload_url.cancel()
+            if upload_url.done() and not upload_url.cancelled():
+                # Retrieve a failure nobody awaited, so asyncio doesn't report it as never retrieved
+                upload_url.exception()